@@ -1,6 +1,5 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
+import numpy as np
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="Eagle Chemicals Rebate Simulator", layout="wide")
@@ -9,42 +8,188 @@ st.title("🦅 Eagle Chemicals: Customer Rebate Simulator")
 st.markdown("### Interactive Value Calculator")
 st.markdown("---")
 
-# --- SIDEBAR: REBATE SELECTOR ---
-st.sidebar.header("Configuration")
-rebate_type = st.sidebar.selectbox(
-    "Select Rebate Structure",
-    ("Tiered Volume (Annual)", "Growth (Over Benchmark)", "Tiered Retention (Quarter & Annual)")
-)
+# --- TIER LOOKUP ---
+# Sorted tier volumes and their rates as arrays, skipping unset (zero-volume)
+# tiers. rates[0] is the "no tier" rate (on equal volumes the later tier wins).
+def tier_schedule(vols, pcts):
+    active = sorted(zip(vols, pcts), key=lambda tier: tier[0])
+    active = [(v, p) for v, p in active if v > 0]
+    return np.array([v for v, _ in active], dtype=float), np.array([0.0] + [p for _, p in active])
 
-# Global Input: Price
-avg_price = st.sidebar.number_input("Average Price per Tonne (EGP)", value=50000, min_value=0, step=1000)
+# Rate earned at a volume (or each volume in an array); the one tier rule every
+# calculation goes through. side='left' gives the rate just below each volume,
+# i.e. the low side of a cliff.
+def tier_rate(volumes, tiers, rates, side='right'):
+    return rates[np.searchsorted(tiers, volumes, side=side)]
 
-# ==========================================
-# 1. TIERED VOLUME (ANNUAL)
-# ==========================================
-if rebate_type == "Tiered Volume (Annual)":
-    st.sidebar.subheader("Define Annual Tiers")
-    t1_vol = st.sidebar.number_input("Tier 1 Volume (Tons)", value=48, min_value=0)
-    t1_pct = st.sidebar.number_input("Tier 1 Rebate (%)", value=0.75, step=0.1) / 100
-    
-    t2_vol = st.sidebar.number_input("Tier 2 Volume (Tons)", value=72, min_value=0)
-    t2_pct = st.sidebar.number_input("Tier 2 Rebate (%)", value=1.00, step=0.1) / 100
+# Rebate earned at a volume or array of volumes (chart breakpoints and quarters
+# today, a batch of customer volumes later).
+def compute_rebates(volumes, tiers, rates, price, side='right'):
+    return volumes * price * tier_rate(volumes, tiers, rates, side)
+
+# --- FIGURE BUILDERS ---
+# Figures are plain dicts: the schema is fixed, so skip plotly.graph_objects'
+# per-trace validation and hand them straight to st.plotly_chart.
+CLIFF_TEMPLATE = dict(layout=dict(
+    xaxis=dict(title="Annual Volume (Tons)"),
+    yaxis=dict(title="Rebate Value (EGP)"),
+))
+
+# Client-side number formatting for the tier tables
+TARGET_PCT_COLUMN = st.column_config.NumberColumn(format="%.2f%%")
+
+# Column setup for the sidebar tier editors (one row per tier)
+TIER_EDITOR_COLUMNS = {
+    "Vol": st.column_config.NumberColumn("Vol (Tons)", min_value=0, step=1),
+    "%": st.column_config.NumberColumn("Rebate %", min_value=0.0, step=0.05, format="%.2f"),
+}
+
+# Numeric column of a tier editor's rows; cleared cells come back empty
+# (None/NaN) and are treated as an unset tier
+def editor_column(rows, col):
+    return np.nan_to_num(np.array(rows[col], dtype=float))
+
+# Tier target table as a plain column dict, which st.dataframe takes directly;
+# rates stay numeric and are formatted client-side via TARGET_PCT_COLUMN.
+def tier_table(vols, pcts, target_col, pct_col):
+    return {
+        "Tier": ["Tier 1", "Tier 2", "Tier 3"],
+        target_col: list(vols),
+        pct_col: [p * 100 for p in pcts]
+    }
+
+# Plotly.js options: no modebar or resize listeners; the growth split chart has
+# no hover content worth keeping, so it is drawn as a static plot
+CHART_CONFIG = dict(responsive=False, displaylogo=False, displayModeBar=False)
+STATIC_CHART_CONFIG = dict(CHART_CONFIG, staticPlot=True)
+
+# Pure functions of scalar inputs, memoized so reruns triggered by unrelated
+# widgets reuse the previously built figure.
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_cliff_fig(t1_vol, t1_pct, t2_vol, t2_pct, t3_vol, t3_pct, sim_vol, total_rebate, avg_price):
+    # The slider can go past the default plot edge; extend the curve to reach it
+    # so no cliff between the edge and the simulated point is skipped
+    x_max_plot = max(int(t3_vol * 1.3) if t3_vol > 0 else 100, sim_vol)
+
+    tiers, pcts = tier_schedule((t1_vol, t2_vol, t3_vol), (t1_pct, t2_pct, t3_pct))
+
+    # The curve is piecewise linear with a jump at each active tier, so plot its
+    # breakpoints directly: the rate just below and at each tier volume
+    edges = np.unique(tiers[tiers < x_max_plot])
+    x_vals = np.concatenate(([0.0], np.repeat(edges, 2), [x_max_plot]))
+    y_vals = compute_rebates(x_vals, tiers, pcts, avg_price)
+    y_vals[1:-1:2] = compute_rebates(edges, tiers, pcts, avg_price, side='left')
+
+    # The simulated point already lies on the curve: insert it (after any cliff
+    # at the same volume) and highlight it in place instead of a second trace
+    here = np.searchsorted(x_vals, sim_vol, side='right')
+    x_vals = np.insert(x_vals, here, sim_vol)
+    y_vals = np.insert(y_vals, here, total_rebate)
+    marker_size = np.zeros(len(x_vals))
+    marker_size[here] = 12
+    labels = [''] * len(x_vals)
+    labels[here] = 'You Are Here'
+
+    # Tier markers are baked into the layout as shapes rather than add_vline calls
+    tier_lines = [(v, label) for v, label in ((t1_vol, "Tier 1"), (t2_vol, "Tier 2"), (t3_vol, "Tier 3")) if v > 0]
+
+    return dict(
+        data=[
+            dict(type='scattergl', x=x_vals, y=y_vals, mode='lines+markers+text', name='Rebate Value',
+                 line=dict(color='#2E86C1', width=3), marker=dict(color='red', size=marker_size),
+                 text=labels, textposition='top left'),
+        ],
+        layout=dict(
+            template=CLIFF_TEMPLATE,
+            title="Potential Earnings (The 'Cliff' Effect)",
+            shapes=[dict(type='line', x0=v, x1=v, yref='paper', y0=0, y1=1, line=dict(dash='dash')) for v, _ in tier_lines],
+            annotations=[dict(x=v, y=1, yref='paper', text=label, showarrow=False, xanchor='left', yanchor='top') for v, label in tier_lines],
+        ),
+    )
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_growth_fig(sim_vol_growth, benchmark_vol, growth_payout):
+    growth_vol = max(0, sim_vol_growth - benchmark_vol)
+
+    bars = [dict(
+        type='bar', x=['Volume'], y=[min(sim_vol_growth, benchmark_vol)], 
+        name='Benchmark (Standard)', marker=dict(color='lightgrey')
+    )]
     
-    t3_vol = st.sidebar.number_input("Tier 3 Volume (Tons)", value=96, min_value=0)
-    t3_pct = st.sidebar.number_input("Tier 3 Rebate (%)", value=1.50, step=0.1) / 100
+    if growth_vol > 0:
+        bars.append(dict(
+            type='bar', x=['Volume'], y=[growth_vol], 
+            name='Growth (Rebate Active)', marker=dict(color='#28B463'),
+            text=f"+{growth_payout:,.0f} EGP", textposition='auto'
+        ))
 
-    st.subheader("📊 Annual Volume Scenario")
+    return dict(data=bars, layout=dict(barmode='stack', title="Volume Split: Standard vs. Growth", yaxis=dict(title="Tons")))
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_stack_fig(q_rates, q_values, year_rate, annual_bonus, at3_pct):
+    quarters = ['Q1', 'Q2', 'Q3', 'Q4', 'EOY Bonus']
+    
+    # Y-Axis Data: Percentage Rates Achieved
+    rates_pct = [r * 100 for r in q_rates] + [year_rate * 100]
     
+    # Text Labels: Combining % and Cash Value
+    # e.g. "0.75% (45,000)"
+    text_labels = [f"{r:.2f}%<br>({v:,.0f} EGP)" for r, v in zip(rates_pct[:-1], q_values)]
+    text_labels.append(f"{rates_pct[-1]:.2f}%<br>({annual_bonus:,.0f} EGP)")
+    
+    colors = ['#3498DB'] * 4 + ['#F1C40F'] # Blue for Qs, Gold for EOY
+
+    # Reference line for the MAX annual tier to show them what they are aiming for
+    max_annual_target = at3_pct * 100
+
+    return dict(
+        data=[dict(
+            type='bar',
+            x=quarters,
+            y=rates_pct,
+            marker=dict(color=colors),
+            text=text_labels,
+            textposition='auto',
+            hovertemplate='%{y:.2f}% Achieved<br>Value: %{text}<extra></extra>'
+        )],
+        layout=dict(
+            title="Retention Performance (% Achieved vs Target)", 
+            yaxis=dict(title="Rebate Percentage Earned (%)", range=[0, max(max_annual_target * 1.2, 1.5)]), # Scale graph nicely
+            shapes=[dict(type='line', xref='paper', x0=0, x1=1, y0=max_annual_target, y1=max_annual_target, line=dict(dash='dot'))],
+            annotations=[dict(xref='paper', x=1, y=max_annual_target, text="Max Annual Tier Target", showarrow=False, xanchor='right', yanchor='bottom')],
+        ),
+    )
+
+# --- SESSION MEMO ---
+# Returns this session's last result for `name` while `key` is unchanged, so a
+# rerun with the same inputs skips the calculation and figure lookup. Metrics
+# and charts are still emitted every run: Streamlit drops any element a run
+# does not re-render.
+def memo_last(name, key, compute):
+    last = st.session_state.get(name)
+    if last is None or last[0] != key:
+        last = (key, compute())
+        st.session_state[name] = last
+    return last[1]
+
+# --- SCENARIO BLOCKS ---
+# Each simulator is a fragment: moving its sliders/inputs reruns only that
+# block, while the sidebar configuration passed in still triggers a full rerun.
+@st.fragment
+def tiered_volume_block(t1_vol, t1_pct, t2_vol, t2_pct, t3_vol, t3_pct, avg_price):
     max_sim = int(t3_vol * 1.5) if t3_vol > 0 else 200
     sim_vol = st.slider("Simulate Total Annual Volume (Tons)", 0, max_sim, int(t1_vol))
 
     # Calculation Logic
-    current_rate = 0.0
-    if sim_vol >= t3_vol and t3_vol > 0: current_rate = t3_pct
-    elif sim_vol >= t2_vol and t2_vol > 0: current_rate = t2_pct
-    elif sim_vol >= t1_vol and t1_vol > 0: current_rate = t1_pct
-    
-    total_rebate = sim_vol * avg_price * current_rate
+    def calculate():
+        tiers, rates = tier_schedule((t1_vol, t2_vol, t3_vol), (t1_pct, t2_pct, t3_pct))
+        current_rate = tier_rate(sim_vol, tiers, rates)
+        total_rebate = compute_rebates(sim_vol, tiers, rates, avg_price)
+        fig = build_cliff_fig(t1_vol, t1_pct, t2_vol, t2_pct, t3_vol, t3_pct, sim_vol, total_rebate, avg_price)
+        return current_rate, total_rebate, fig
+
+    key = (sim_vol, avg_price, t1_vol, t1_pct, t2_vol, t2_pct, t3_vol, t3_pct)
+    current_rate, total_rebate, fig = memo_last("tiered_volume", key, calculate)
     effective_discount = current_rate * 100
 
     # Metrics
@@ -65,42 +210,19 @@ if rebate_type == "Tiered Volume (Annual)":
         c3.success("🏆 Maximum Tier Achieved!")
 
     # Visualization
-    x_max_plot = int(t3_vol * 1.3) if t3_vol > 0 else 100
-    x_vals = list(range(0, x_max_plot))
-    y_vals = []
-    
-    for x in x_vals:
-        r = 0
-        if x >= t3_vol and t3_vol > 0: r = t3_pct
-        elif x >= t2_vol and t2_vol > 0: r = t2_pct
-        elif x >= t1_vol and t1_vol > 0: r = t1_pct
-        y_vals.append(x * avg_price * r)
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=x_vals, y=y_vals, mode='lines', name='Rebate Value', line=dict(color='#2E86C1', width=3)))
-    fig.add_trace(go.Scatter(x=[sim_vol], y=[total_rebate], mode='markers', name='You Are Here', marker=dict(color='red', size=12)))
-    
-    if t1_vol > 0: fig.add_vline(x=t1_vol, line_dash="dash", annotation_text="Tier 1")
-    if t2_vol > 0: fig.add_vline(x=t2_vol, line_dash="dash", annotation_text="Tier 2")
-    if t3_vol > 0: fig.add_vline(x=t3_vol, line_dash="dash", annotation_text="Tier 3")
-
-    fig.update_layout(title="Potential Earnings (The 'Cliff' Effect)", xaxis_title="Annual Volume (Tons)", yaxis_title="Rebate Value (EGP)")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, config=CHART_CONFIG, key="cliff_chart")
 
-# ==========================================
-# 2. GROWTH REBATE
-# ==========================================
-elif rebate_type == "Growth (Over Benchmark)":
-    st.sidebar.subheader("Growth Settings")
-    benchmark_vol = st.sidebar.number_input("Benchmark Volume (Last Year)", value=100, min_value=0)
-    growth_rebate_pct = st.sidebar.number_input("Growth Rebate (%)", value=3.0, step=0.1) / 100
-    
-    st.subheader("🚀 Growth Accelerator")
-    
+@st.fragment
+def growth_block(benchmark_vol, growth_rebate_pct, avg_price):
     sim_vol_growth = st.slider("Simulate Total Volume", 0, int(benchmark_vol * 2) if benchmark_vol > 0 else 200, int(benchmark_vol))
     
-    growth_vol = max(0, sim_vol_growth - benchmark_vol)
-    growth_payout = growth_vol * avg_price * growth_rebate_pct
+    def calculate():
+        growth_vol = max(0, sim_vol_growth - benchmark_vol)
+        growth_payout = growth_vol * avg_price * growth_rebate_pct
+        return growth_vol, growth_payout, build_growth_fig(sim_vol_growth, benchmark_vol, growth_payout)
+
+    key = (sim_vol_growth, avg_price, benchmark_vol, growth_rebate_pct)
+    growth_vol, growth_payout, fig = memo_last("growth", key, calculate)
     
     c1, c2, c3 = st.columns(3)
     c1.metric("Growth Volume", f"{growth_vol} Tons")
@@ -112,65 +234,10 @@ elif rebate_type == "Growth (Over Benchmark)":
     else:
         c3.metric("Status", "Below Benchmark", delta_color="inverse")
 
-    fig = go.Figure()
-    fig.add_trace(go.Bar(
-        x=['Volume'], y=[min(sim_vol_growth, benchmark_vol)], 
-        name='Benchmark (Standard)', marker_color='lightgrey'
-    ))
-    
-    if growth_vol > 0:
-        fig.add_trace(go.Bar(
-            x=['Volume'], y=[growth_vol], 
-            name='Growth (Rebate Active)', marker_color='#28B463',
-            text=f"+{growth_payout:,.0f} EGP", textposition='auto'
-        ))
-
-    fig.update_layout(barmode='stack', title="Volume Split: Standard vs. Growth", yaxis_title="Tons")
-    st.plotly_chart(fig, use_container_width=True)
-
-# ==========================================
-# 3. TIERED RETENTION (QUARTERLY + ANNUAL)
-# ==========================================
-elif rebate_type == "Tiered Retention (Quarter & Annual)":
-    
-    # --- CONFIGURATION (SIDEBAR) ---
-    with st.sidebar.expander("1. Annual Tiers (EOY Bonus)", expanded=False):
-        at1_vol = st.number_input("Annual T1 Vol", value=200, min_value=0); at1_pct = st.number_input("Annual T1 %", value=0.5)/100
-        at2_vol = st.number_input("Annual T2 Vol", value=300, min_value=0); at2_pct = st.number_input("Annual T2 %", value=0.75)/100
-        at3_vol = st.number_input("Annual T3 Vol", value=400, min_value=0); at3_pct = st.number_input("Annual T3 %", value=1.0)/100
-
-    with st.sidebar.expander("2. Quarterly Tiers (Recurring)", expanded=True):
-        qt1_vol = st.number_input("Quarterly T1 Vol", value=50, min_value=0); qt1_pct = st.number_input("Quarterly T1 %", value=0.5)/100
-        qt2_vol = st.number_input("Quarterly T2 Vol", value=75, min_value=0); qt2_pct = st.number_input("Quarterly T2 %", value=0.75)/100
-        qt3_vol = st.number_input("Quarterly T3 Vol", value=100, min_value=0); qt3_pct = st.number_input("Quarterly T3 %", value=1.0)/100
-
-    # --- TOP SUMMARY: THE RULES ---
-    st.subheader("📋 Retention Plan Targets")
-    
-    # Create DataFrames for clean display
-    q_data = {
-        "Tier": ["Tier 1", "Tier 2", "Tier 3"],
-        "Quarterly Target (Tons)": [qt1_vol, qt2_vol, qt3_vol],
-        "Rebate %": [f"{qt1_pct*100}%", f"{qt2_pct*100}%", f"{qt3_pct*100}%"]
-    }
-    
-    a_data = {
-        "Tier": ["Tier 1", "Tier 2", "Tier 3"],
-        "Annual Target (Tons)": [at1_vol, at2_vol, at3_vol],
-        "Bonus %": [f"{at1_pct*100}%", f"{at2_pct*100}%", f"{at3_pct*100}%"]
-    }
-
-    c1, c2 = st.columns(2)
-    with c1:
-        st.markdown("**Quarterly Targets (Credit Notes)**")
-        st.dataframe(pd.DataFrame(q_data), hide_index=True, use_container_width=True)
-    with c2:
-        st.markdown("**Annual Targets (EOY Bonus)**")
-        st.dataframe(pd.DataFrame(a_data), hide_index=True, use_container_width=True)
-
-    st.markdown("---")
-    st.subheader("📅 Performance Simulator")
+    st.plotly_chart(fig, use_container_width=True, config=STATIC_CHART_CONFIG, key="growth_chart")
 
+@st.fragment
+def retention_block(q_tiers, q_tier_rates, a_tiers, a_tier_rates, at1_vol, at3_pct, avg_price):
     # Simulation Sliders
     col1, col2, col3, col4 = st.columns(4)
     with col1: q1_v = st.number_input("Q1 Volume", value=60, min_value=0)
@@ -179,26 +246,24 @@ elif rebate_type == "Tiered Retention (Quarter & Annual)":
     with col4: q4_v = st.number_input("Q4 Volume", value=0, min_value=0)
 
     # --- CALCULATIONS ---
-    def get_q_rate(v):
-        if v >= qt3_vol and qt3_vol > 0: return qt3_pct
-        elif v >= qt2_vol and qt2_vol > 0: return qt2_pct
-        elif v >= qt1_vol and qt1_vol > 0: return qt1_pct
-        return 0.0
-
-    q_volumes = [q1_v, q2_v, q3_v, q4_v]
-    q_rates = [get_q_rate(v) for v in q_volumes]
-    q_values = [v * avg_price * r for v, r in zip(q_volumes, q_rates)]
-    
-    total_q_rebate = sum(q_values)
-    total_year_vol = sum(q_volumes)
-
-    # Annual Logic
-    year_rate = 0.0
-    if total_year_vol >= at3_vol and at3_vol > 0: year_rate = at3_pct
-    elif total_year_vol >= at2_vol and at2_vol > 0: year_rate = at2_pct
-    elif total_year_vol >= at1_vol and at1_vol > 0: year_rate = at1_pct
-    
-    annual_bonus = total_year_vol * avg_price * year_rate
+    def calculate():
+        q_volumes = np.array([q1_v, q2_v, q3_v, q4_v])
+        q_rates = tier_rate(q_volumes, q_tiers, q_tier_rates)
+        q_values = compute_rebates(q_volumes, q_tiers, q_tier_rates, avg_price)
+        
+        total_q_rebate = q_values.sum()
+        total_year_vol = q_volumes.sum()
+
+        # Annual Logic
+        year_rate = tier_rate(total_year_vol, a_tiers, a_tier_rates)
+        annual_bonus = compute_rebates(total_year_vol, a_tiers, a_tier_rates, avg_price)
+
+        fig = build_stack_fig(tuple(q_rates.tolist()), tuple(q_values.tolist()), year_rate, annual_bonus, at3_pct)
+        return total_q_rebate, total_year_vol, annual_bonus, fig
+
+    tiers_key = tuple(arr.tobytes() for arr in (q_tiers, q_tier_rates, a_tiers, a_tier_rates))
+    key = (q1_v, q2_v, q3_v, q4_v, avg_price, at3_pct) + tiers_key
+    total_q_rebate, total_year_vol, annual_bonus, fig = memo_last("retention", key, calculate)
     grand_total = total_q_rebate + annual_bonus
 
     # --- METRICS ---
@@ -208,39 +273,96 @@ elif rebate_type == "Tiered Retention (Quarter & Annual)":
     m3.metric("GRAND TOTAL VALUE", f"{grand_total:,.0f} EGP", delta="Total Cash Back")
 
     # --- VISUALIZATION: % Achieved ---
-    quarters = ['Q1', 'Q2', 'Q3', 'Q4', 'EOY Bonus']
+    st.plotly_chart(fig, use_container_width=True, config=CHART_CONFIG, key="retention_chart")
+
+    if annual_bonus == 0:
+        st.warning(f"⚠ You are currently missing the Annual Bonus! Total Volume: {total_year_vol}. Need {at1_vol} to unlock.")
+    else:
+        st.success(f"🎉 You have unlocked the Annual Bonus Tier!")
+
+# --- SIDEBAR: REBATE SELECTOR ---
+st.sidebar.header("Configuration")
+rebate_type = st.sidebar.selectbox(
+    "Select Rebate Structure",
+    ("Tiered Volume (Annual)", "Growth (Over Benchmark)", "Tiered Retention (Quarter & Annual)")
+)
+
+# Global Input: Price
+avg_price = st.sidebar.number_input("Average Price per Tonne (EGP)", value=50000, min_value=0, step=1000)
+
+# ==========================================
+# 1. TIERED VOLUME (ANNUAL)
+# ==========================================
+if rebate_type == "Tiered Volume (Annual)":
+    # Tier edits are batched into one rerun when the form is applied
+    with st.sidebar.form("annual_tier_config"):
+        st.subheader("Define Annual Tiers")
+        t1_vol = st.number_input("Tier 1 Volume (Tons)", value=48, min_value=0)
+        t1_pct = st.number_input("Tier 1 Rebate (%)", value=0.75, step=0.1) / 100
+        
+        t2_vol = st.number_input("Tier 2 Volume (Tons)", value=72, min_value=0)
+        t2_pct = st.number_input("Tier 2 Rebate (%)", value=1.00, step=0.1) / 100
+        
+        t3_vol = st.number_input("Tier 3 Volume (Tons)", value=96, min_value=0)
+        t3_pct = st.number_input("Tier 3 Rebate (%)", value=1.50, step=0.1) / 100
+
+        st.form_submit_button("Apply")
+
+    st.subheader("📊 Annual Volume Scenario")
     
-    # Y-Axis Data: Percentage Rates Achieved
-    rates_pct = [r * 100 for r in q_rates] + [year_rate * 100]
+    tiered_volume_block(t1_vol, t1_pct, t2_vol, t2_pct, t3_vol, t3_pct, avg_price)
+
+# ==========================================
+# 2. GROWTH REBATE
+# ==========================================
+elif rebate_type == "Growth (Over Benchmark)":
+    st.sidebar.subheader("Growth Settings")
+    benchmark_vol = st.sidebar.number_input("Benchmark Volume (Last Year)", value=100, min_value=0)
+    growth_rebate_pct = st.sidebar.number_input("Growth Rebate (%)", value=3.0, step=0.1) / 100
     
-    # Text Labels: Combining % and Cash Value
-    # e.g. "0.75% (45,000)"
-    text_labels = [f"{r:.2f}%<br>({v:,.0f} EGP)" for r, v in zip(rates_pct[:-1], q_values)]
-    text_labels.append(f"{rates_pct[-1]:.2f}%<br>({annual_bonus:,.0f} EGP)")
+    st.subheader("🚀 Growth Accelerator")
     
-    colors = ['#3498DB'] * 4 + ['#F1C40F'] # Blue for Qs, Gold for EOY
+    growth_block(benchmark_vol, growth_rebate_pct, avg_price)
 
-    fig = go.Figure(go.Bar(
-        x=quarters,
-        y=rates_pct,
-        marker_color=colors,
-        text=text_labels,
-        textposition='auto',
-        hovertemplate='%{y:.2f}% Achieved<br>Value: %{text}<extra></extra>'
-    ))
+# ==========================================
+# 3. TIERED RETENTION (QUARTERLY + ANNUAL)
+# ==========================================
+elif rebate_type == "Tiered Retention (Quarter & Annual)":
     
-    # Add a reference line for the MAX annual tier to show them what they are aiming for
-    max_annual_target = at3_pct * 100
-    fig.add_hline(y=max_annual_target, line_dash="dot", annotation_text="Max Annual Tier Target", annotation_position="top right")
+    # --- CONFIGURATION (SIDEBAR) ---
+    # Tier edits are batched into one rerun when the form is applied
+    with st.sidebar.form("retention_tier_config"):
+        with st.expander("1. Annual Tiers (EOY Bonus)", expanded=False):
+            annual = st.data_editor({"Tier": ["T1", "T2", "T3"], "Vol": [200, 300, 400], "%": [0.5, 0.75, 1.0]},
+                                    key="annual_tiers", hide_index=True, disabled=["Tier"], column_config=TIER_EDITOR_COLUMNS)
+
+        with st.expander("2. Quarterly Tiers (Recurring)", expanded=True):
+            quarterly = st.data_editor({"Tier": ["T1", "T2", "T3"], "Vol": [50, 75, 100], "%": [0.5, 0.75, 1.0]},
+                                       key="quarterly_tiers", hide_index=True, disabled=["Tier"], column_config=TIER_EDITOR_COLUMNS)
+
+        st.form_submit_button("Apply")
+
+    at1_vol, at2_vol, at3_vol = editor_column(annual, "Vol").astype(int).tolist()
+    at1_pct, at2_pct, at3_pct = (editor_column(annual, "%") / 100).tolist()
+    qt1_vol, qt2_vol, qt3_vol = editor_column(quarterly, "Vol").astype(int).tolist()
+    qt1_pct, qt2_pct, qt3_pct = (editor_column(quarterly, "%") / 100).tolist()
+
+    # --- TOP SUMMARY: THE RULES ---
+    st.subheader("📋 Retention Plan Targets")
     
-    fig.update_layout(
-        title="Retention Performance (% Achieved vs Target)", 
-        yaxis_title="Rebate Percentage Earned (%)",
-        yaxis_range=[0, max(max_annual_target * 1.2, 1.5)] # Scale graph nicely
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown("**Quarterly Targets (Credit Notes)**")
+        st.dataframe(tier_table((qt1_vol, qt2_vol, qt3_vol), (qt1_pct, qt2_pct, qt3_pct), "Quarterly Target (Tons)", "Rebate %"), hide_index=True, use_container_width=True,
+                     column_config={"Rebate %": TARGET_PCT_COLUMN})
+    with c2:
+        st.markdown("**Annual Targets (EOY Bonus)**")
+        st.dataframe(tier_table((at1_vol, at2_vol, at3_vol), (at1_pct, at2_pct, at3_pct), "Annual Target (Tons)", "Bonus %"), hide_index=True, use_container_width=True,
+                     column_config={"Bonus %": TARGET_PCT_COLUMN})
 
-    if annual_bonus == 0:
-        st.warning(f"⚠ You are currently missing the Annual Bonus! Total Volume: {total_year_vol}. Need {at1_vol} to unlock.")
-    else:
-        st.success(f"🎉 You have unlocked the Annual Bonus Tier!")
+    st.markdown("---")
+    st.subheader("📅 Performance Simulator")
+
+    q_tiers, q_tier_rates = tier_schedule((qt1_vol, qt2_vol, qt3_vol), (qt1_pct, qt2_pct, qt3_pct))
+    a_tiers, a_tier_rates = tier_schedule((at1_vol, at2_vol, at3_vol), (at1_pct, at2_pct, at3_pct))
+    retention_block(q_tiers, q_tier_rates, a_tiers, a_tier_rates, at1_vol, at3_pct, avg_price)